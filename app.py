@@ -1,137 +1,113 @@
-import gradio as gr
-import shutil
-import time
-import os
-from input_processing import process_user_input
-from code_generation import generate_website_code
-from save_website_code_files import save_generated_website
-from validate_generated_code import validate_and_fix_website
-from vercel_deployment import deploy_to_vercel
-
-# Use a relative path instead of absolute path
-UPLOAD_FOLDER = os.path.join("static", "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def handle_input(prompt, images, image_prompts, website_name, progress=gr.Progress()):
-    image_data = []
-
-    progress(0, desc="Processing input...")
-    
-    if images:
-        prompt_list = [p.strip() for p in image_prompts.split(",")] if image_prompts else []
-
-        for i, img in enumerate(images):
-            original_name = os.path.basename(img.name if hasattr(img, 'name') else img)
-            name, ext = os.path.splitext(original_name)
-            unique_name = f"{name}_{int(time.time()*1000)}{ext}"  # e.g., upper_1634567890123.jpeg
-            img_path = os.path.join(UPLOAD_FOLDER, unique_name)
-
-            if isinstance(img, str):
-                if os.path.abspath(img) != os.path.abspath(img_path):
-                    shutil.copy(img, img_path)
-                    print(f"Copied image from {img} to {img_path}")
-            else:
-                img.save(img_path)
-                print(f"Saved image to {img_path}")
-
-            img_prompt = prompt_list[i] if i < len(prompt_list) else "auto"
-            image_data.append({"path": img_path, "placement": img_prompt})
-
-    # Processing input
-    structured_input = process_user_input(prompt, image_data, image_prompts)
-    if "error" in structured_input:
-        return {"error": structured_input["error"]}
-    
-    # Generating code
-    progress(0.25, desc="Generating website code...")
-    generated_code = generate_website_code(structured_input)
-    if "error" in generated_code:
-        return {"error": generated_code["error"]}
-
-    # Saving website files
-    progress(0.5, desc="Saving website files...")
-    website_folder = save_generated_website(generated_code, image_data)
-    if not website_folder:
-        return {"error": "❌ Website generation failed. Please try again."}
-
-    # Validating website
-    progress(0.75, desc="Validating website...")
-    validation_result = validate_and_fix_website(structured_input, website_folder)
-    if "error" in validation_result:
-        return {"error": validation_result["error"]}
-
-    validated_folder = validation_result.get("validated_folder", website_folder)
-    
-    # Deploying to Vercel
-    progress(0.9, desc="Deploying to Vercel...")
-    deployment_result = deploy_to_vercel(validated_folder, website_name)
-
-    if "error" in deployment_result:
-        return {
-            "error": deployment_result["error"], 
-            "local_folder": validated_folder
-        }
-
-    progress(1.0, desc="Website deployed! 🚀")
-    deployment_url = deployment_result.get("url", "URL not available")
-    
-    return {
-        "message": "✅ Website generated, validated, and deployed successfully!",
-        "deployment_url": deployment_url,   
-        "local_folder": validated_folder,
-        "project_name": deployment_result.get("project_name", "")
-    }
-
-with gr.Blocks() as ui:
-    gr.Markdown("# 🚀 AI Website Generator")
-
-    with gr.Row():
-        prompt = gr.Textbox(
-            label="Enter your website description", 
-            lines=4, 
-            placeholder="e.g., A personal website for an AI Engineer.",
-            elem_id="prompt-input"
+import json
+from website_pipeline import save_uploaded_images, run_pipeline, edit_website, promote_website, run_once
+
+def build_ui():
+    """Builds the Gradio interface. Gradio is imported here so importing app stays cheap."""
+    import gradio as gr
+
+    def handle_input(prompt, images, image_prompts, website_name, edit_site, progress=gr.Progress()):
+        progress(0, desc="Processing input...")
+
+        image_data = save_uploaded_images(images, image_prompts)
+
+        # Serve a local preview straight after validation; deploying is a separate "promote" step
+        def job():
+            if edit_site and edit_site.strip():
+                return edit_website(edit_site, prompt, image_data, image_prompts, website_name, deploy=False, preview=True, progress=progress)
+            return run_pipeline(prompt, image_data, image_prompts, website_name, deploy=False, preview=True, progress=progress)
+
+        # Uploads are named by content, so their paths identify the images; a repeated click joins the running job
+        job_key = json.dumps([prompt, image_prompts, [img["path"] for img in image_data], website_name, edit_site])
+        result = run_once(job_key, job)
+        preview_link = f"👀 **Preview:** [{result['preview_url']}]({result['preview_url']})" if "preview_url" in result else ""
+        return result, preview_link, result.get("local_folder")
+
+    def handle_promote(local_folder, website_name, progress=gr.Progress()):
+        if not local_folder:
+            return {"error": "❌ Generate a website before promoting it to Vercel."}
+
+        progress(0.5, desc="Deploying to Vercel...")
+        return promote_website(local_folder, website_name)
+
+    with gr.Blocks() as ui:
+        gr.Markdown("# 🚀 AI Website Generator")
+
+        with gr.Row():
+            prompt = gr.Textbox(
+                label="Enter your website description", 
+                lines=4, 
+                placeholder="e.g., A personal website for an AI Engineer.",
+                elem_id="prompt-input"
+            )
+
+        with gr.Row():
+            website_name = gr.Textbox(
+                label="Website Name (optional)", 
+                placeholder="my-awesome-website",
+                elem_id="website-name-input"
+            )
+
+        with gr.Row():
+            edit_site = gr.Textbox(
+                label="Edit Existing Website (optional)",
+                placeholder="e.g., website_012 - describe the change in the prompt; only the affected parts of the site are regenerated",
+                elem_id="edit-site-input"
+            )
+
+        with gr.Row():
+            images = gr.Files(
+                file_types=["image"], 
+                label="Upload Images", 
+                interactive=True,
+                elem_id="image-upload"
+            )
+
+        with gr.Row():
+            image_prompts = gr.Textbox(
+                label="Describe Image Placement (comma-separated)", 
+                placeholder="e.g., Hero section, About page, Footer",
+                elem_id="image-prompts-input"
+            )
+
+        with gr.Row():
+            submit = gr.Button(
+                "Generate Website", 
+                variant="primary",
+                elem_id="submit-button"
+            )
+            promote = gr.Button(
+                "Promote to Vercel",
+                elem_id="promote-button"
+            )
+
+        with gr.Row():
+            preview_link = gr.Markdown(elem_id="preview-link")
+
+        with gr.Row():
+            output = gr.JSON(
+                label="Result",
+                elem_id="output-json"
+            )
+
+        local_folder = gr.State()
+
+        submit.click(
+            handle_input, 
+            inputs=[prompt, images, image_prompts, website_name, edit_site], 
+            outputs=[output, preview_link, local_folder]
         )
 
-    with gr.Row():
-        website_name = gr.Textbox(
-            label="Website Name (optional)", 
-            placeholder="my-awesome-website",
-            elem_id="website-name-input"
+        promote.click(
+            handle_promote,
+            inputs=[local_folder, website_name],
+            outputs=output
         )
 
-    with gr.Row():
-        images = gr.Files(
-            file_types=["image"], 
-            label="Upload Images", 
-            interactive=True,
-            elem_id="image-upload"
-        )
-
-    with gr.Row():
-        image_prompts = gr.Textbox(
-            label="Describe Image Placement (comma-separated)", 
-            placeholder="e.g., Hero section, About page, Footer",
-            elem_id="image-prompts-input"
-        )
-
-    with gr.Row():
-        submit = gr.Button(
-            "Generate & Deploy Website", 
-            variant="primary",
-            elem_id="submit-button"
-        )
-
-    with gr.Row():
-        output = gr.JSON(
-            label="Result",
-            elem_id="output-json"
-        )
+    return ui
 
-    submit.click(
-        handle_input, 
-        inputs=[prompt, images, image_prompts, website_name], 
-        outputs=output
-    )
+if __name__ == "__main__":
+    from retention import start_retention_worker
 
-ui.launch()
\ No newline at end of file
+    # Archive old sites in the background so generated_websites doesn't grow without bound
+    start_retention_worker()
+    build_ui().launch()
\ No newline at end of file
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from website_pipeline import save_uploaded_images, run_pipeline, edit_website
+from openai_client import get_request_stats, ensure_request_capacity
+from retention import start_retention_worker
+
+DEFAULT_WORKERS = 4
+
+def load_jobs(jobs_path):
+    """
+    Reads a JSONL file of jobs. Each line needs a "prompt"; "images", "placements", "name", "id" and
+    "site" (an existing website_NNN to edit incrementally) are optional.
+    """
+    jobs = []
+    with open(jobs_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            job = json.loads(line)
+            if not job.get("prompt"):
+                raise ValueError(f"Job on line {line_number} of {jobs_path} has no prompt")
+            job.setdefault("id", str(line_number))
+            job["id"] = str(job["id"])
+            jobs.append(job)
+    return jobs
+
+def load_completed_job_ids(manifest_path):
+    """Returns the ids of jobs already recorded as successful in the manifest, so a rerun can resume."""
+    completed = set()
+    if not os.path.exists(manifest_path):
+        return completed
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by a crash mid-write; that job simply runs again
+                continue
+            if entry.get("status") == "success":
+                completed.add(str(entry.get("id")))
+    return completed
+
+def _image_prompts_for(job):
+    placements = job.get("placements")
+    if isinstance(placements, list):
+        return ",".join(placements)
+    return placements or ""
+
+def run_job(job, deploy=True):
+    """Runs a single batch job through the pipeline and returns its manifest entry."""
+    started = time.time()
+    image_prompts = _image_prompts_for(job)
+
+    try:
+        image_data = save_uploaded_images(job.get("images") or [], image_prompts, name_suffix=f"_{job['id']}")
+        if job.get("site"):
+            result = edit_website(job["site"], job["prompt"], image_data, image_prompts, job.get("name"), deploy=deploy)
+        else:
+            result = run_pipeline(job["prompt"], image_data, image_prompts, job.get("name"), deploy=deploy)
+    except Exception as e:
+        result = {"error": f"Job failed: {str(e)}"}
+
+    entry = {
+        "id": job["id"],
+        "name": job.get("name"),
+        "status": "error" if "error" in result else "success",
+        "duration_seconds": round(time.time() - started, 2)
+    }
+    entry.update(result)
+    return entry
+
+def run_batch(jobs_path, manifest_path, workers=DEFAULT_WORKERS, deploy=True, resume=True):
+    """
+    Generates every job in jobs_path with up to `workers` jobs in flight and appends one
+    JSONL line per finished job to manifest_path. With resume=True, jobs that already
+    succeeded in an earlier run are skipped.
+    """
+    jobs = load_jobs(jobs_path)
+    completed = load_completed_job_ids(manifest_path) if resume else set()
+    pending = [job for job in jobs if job["id"] not in completed]
+
+    print(f"📋 {len(jobs)} jobs found, {len(jobs) - len(pending)} already done, {len(pending)} to run with {workers} workers")
+
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+
+    manifest_lock = threading.Lock()
+    summary = {"success": 0, "error": 0, "skipped": len(jobs) - len(pending)}
+
+    # Each worker has one request in flight plus at most one hedge
+    ensure_request_capacity(2 * workers)
+    with open(manifest_path, "a", encoding="utf-8") as manifest, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, job, deploy): job for job in pending}
+        for future in as_completed(futures):
+            entry = future.result()
+            with manifest_lock:
+                manifest.write(json.dumps(entry) + "\n")
+                manifest.flush()
+            summary[entry["status"]] += 1
+
+            if entry["status"] == "success":
+                print(f"✅ Job {entry['id']} finished in {entry['duration_seconds']}s")
+            else:
+                print(f"❌ Job {entry['id']} failed: {entry['error']}")
+
+    print(f"🎉 Batch complete: {summary['success']} succeeded, {summary['error']} failed, {summary['skipped']} skipped")
+    summary["llm_requests"] = get_request_stats()
+    print(f"📈 LLM requests: {summary['llm_requests']['requests']} sent, {summary['llm_requests']['hedges']} hedged, {summary['llm_requests']['coalesced']} coalesced")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate websites in bulk from a JSONL file of jobs.")
+    parser.add_argument("jobs", help="JSONL file with one job per line (prompt, images, placements, name, id)")
+    parser.add_argument("--manifest", default="batch_manifest.jsonl", help="JSONL file that results are appended to")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of jobs to run in parallel")
+    parser.add_argument("--no-deploy", action="store_true", help="Generate and validate only, skip the Vercel deployment")
+    parser.add_argument("--no-resume", action="store_true", help="Rerun jobs even if the manifest records them as done")
+    parser.add_argument("--no-retention", action="store_true", help="Don't archive old sites in the background during the run")
+    args = parser.parse_args()
+
+    if not args.no_retention:
+        # Large batches fill generated_websites quickly; archive idle sites while the batch runs
+        start_retention_worker()
+
+    summary = run_batch(
+        args.jobs,
+        args.manifest,
+        workers=args.workers,
+        deploy=not args.no_deploy,
+        resume=not args.no_resume
+    )
+    return 1 if summary["error"] else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
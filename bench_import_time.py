@@ -0,0 +1,85 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules a pool worker imports before it can take its first job
+MODULES = [
+    "input_processing",
+    "code_generation",
+    "validate_generated_code",
+    "save_website_code_files",
+    "vercel_deployment",
+    "website_pipeline",
+    "batch_generation",
+    "app",
+]
+
+# Target cold start for a worker process, interpreter start-up included
+DEFAULT_BUDGET_MS = 300
+
+# Heavy dependencies that must only be imported on first use
+DEFERRED_MODULES = ["openai", "gradio", "dotenv"]
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in {deferred!r} if m in sys.modules]
+print(f"{{elapsed:.2f}} {{','.join(loaded)}}")
+"""
+
+def measure(module, runs):
+    """Imports `module` in `runs` fresh interpreters without OPENAI_API_KEY set.
+
+    Returns (median import ms, median process wall ms, heavy modules that were loaded).
+    """
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    here = os.path.dirname(os.path.abspath(__file__))
+    import_times, wall_times, loaded = [], [], set()
+
+    for _ in range(runs):
+        start = _now_ms()
+        result = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, deferred=DEFERRED_MODULES)],
+            cwd=here, env=env, capture_output=True, text=True
+        )
+        wall_times.append(_now_ms() - start)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+        elapsed, _, heavy = result.stdout.strip().partition(" ")
+        import_times.append(float(elapsed))
+        loaded.update(m for m in heavy.split(",") if m)
+
+    return statistics.median(import_times), statistics.median(wall_times), sorted(loaded)
+
+def _now_ms():
+    return time.perf_counter() * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the pipeline modules.")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Max cold start (process wall time) per module")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'module':<26}{'import ms':>10}{'cold start ms':>15}  heavy imports")
+    for module in MODULES:
+        import_ms, wall_ms, loaded = measure(module, args.runs)
+        over_budget = wall_ms > args.budget_ms
+        failures += over_budget or bool(loaded)
+        status = "❌" if over_budget or loaded else "✅"
+        print(f"{module:<26}{import_ms:>10.1f}{wall_ms:>15.1f}  {', '.join(loaded) or '-'} {status}")
+
+    if failures:
+        print(f"\n❌ {failures} module(s) over the {args.budget_ms:.0f} ms budget or importing heavy dependencies eagerly")
+        return 1
+    print(f"\n✅ All modules start within {args.budget_ms:.0f} ms")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,19 +1,19 @@
-from openai import OpenAI
-import os
-import json
-import re
-from dotenv import load_dotenv
-
-load_dotenv()
-
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
-openai = OpenAI(api_key=openai_api_key)
-
-MODEL = "gpt-4o"
-
-def generate_website_code(structured_data):
+from openai_client import create_chat_completion
+from prompt_payload import build_prompt_payload, token_usage_report
+from tolerant_json import request_json_files
+from incremental_regeneration import page_filename
+from model_routing import route_stage
+from quality_gates import score_website_files
+
+STAGE = "generation"
+
+def generate_website_code(structured_data, only_files=None, current_files=None):
+    """
+    Generates the website files for structured_data.
+
+    For incremental edits pass only_files (the files to regenerate) and current_files (name -> content
+    of the site as it stands); only the listed files are returned and the rest are left untouched.
+    """
     system_prompt = """You are an elite senior full-stack developer specializing in modern, responsive, and visually stunning websites. Use **HTML, Tailwind CSS, Vanilla JS, and Alpine.js (if needed)**. Follow these guidelines:
 
 1. **Tech Stack**:  
@@ -78,45 +78,75 @@ def generate_website_code(structured_data):
     - If website structure is not present you have freedom to make it either multi page or single page depending on the prompt.
 """
 
-    # Preprocess structured_data to force images/ paths
-    modified_structured_data = structured_data.copy()
-    if "image_placements" in modified_structured_data:
-        for img in modified_structured_data["image_placements"]:
-            if "path" in img:
-                img_name = os.path.basename(img["path"])
-                img["path"] = f"images/{img_name}"  # Force images/ here
+    # Image paths are forced to images/ and the payload is compacted to the stage's token budget
+    payload, payload_report = build_prompt_payload(structured_data, STAGE)
 
     user_prompt = f"""
 Generate a senior-dev-level website based on the following input. Follow the user's requests strictly and use your expertise to fill any gaps creatively.
 
-### Input Data:  
-- **Theme**: {modified_structured_data.get('websiteTheme', 'Default Modern Theme')}  
-- **Images**: {modified_structured_data.get('images', 'No images provided')}  
-- **Content**: {json.dumps(modified_structured_data, indent=2)}  
+### Input Data (JSON):
+{payload}
 
 Return the response as a valid JSON object with the required keys.  
 """
 
-    try:
-        response = openai.chat.completions.create(
-            model=MODEL,
-            messages=[
+    if only_files:
+        current_files = current_files or {}
+        unchanged = sorted(f for f in current_files if f not in only_files)
+        user_prompt += f"""
+### Incremental Edit:
+This website already exists and only part of its input changed. Return ONLY these files: {", ".join(only_files)}.
+The other files ({", ".join(unchanged) or "none"}) are unchanged and will be reused as they are, so keep navigation links, class names and script hooks consistent with them.
+"""
+        for file_name in only_files:
+            if file_name in current_files:
+                user_prompt += f"\n### Current {file_name}:\n{current_files[file_name]}\n"
+
+    if only_files:
+        expected_files = list(only_files)
+    else:
+        expected_files = ["index.html"]
+        if structured_data.get("website_structure") == "multi-page":
+            expected_files = list(dict.fromkeys(expected_files + [page_filename(p) for p in structured_data.get("pages", [])]))
+
+    responses = []
+
+    def call(model):
+        def create(messages):
+            response = create_chat_completion(
+                hedge_key=f"{STAGE}/{model}",
+                model=model,
+                messages=messages,
+                temperature=0.6,
+                response_format={"type": "json_object"}
+            )
+            responses.append(response)
+            return response
+
+        # Large multi-page sites can hit the output token limit; keep complete files and ask only for the rest
+        files, _ = request_json_files(
+            create,
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.6,
-            response_format={"type": "json_object"}
+            expected_files=expected_files
         )
+        return files
 
-        raw_content = response.choices[0].message.content.strip()
-        raw_content = re.sub(r"^```json|```$", "", raw_content).strip()
+    try:
+        # Start on the fast tier; escalate only if the code fails the static validation score
+        generated_code, routing = route_stage(STAGE, call, lambda files: score_website_files(files, expected_files))
 
-        try:
-            generated_code = json.loads(raw_content)
-            return generated_code
-        except json.JSONDecodeError:
-            print(f"Failed to parse JSON. Raw response: {raw_content}")
+        if only_files:
+            generated_code = {k: v for k, v in generated_code.items() if k in only_files}
+        if not generated_code:
+            print(f"Failed to parse JSON. Raw response: {responses[-1].choices[0].message.content if responses else None}")
             return {"error": "Failed to generate valid website code."}
+
+        generated_code["token_usage"] = token_usage_report(STAGE, responses, payload_report)
+        generated_code["token_usage"]["routing"] = routing
+        return generated_code
     except Exception as e:
         print(f"Error in generate_website_code: {e}")
-        return {"error": f"Error generating website code: {e}"}
\ No newline at end of file
+        return {"error": f"Error generating website code: {e}"}
@@ -0,0 +1,127 @@
+import os
+import re
+from save_website_code_files import GENERATED_WEBSITES_DIR
+
+# Top-level keys that shape every page; a change to any of them regenerates the whole site
+GLOBAL_KEYS = {
+    "website_structure", "pages", "websiteTheme", "theme", "colorScheme", "color_scheme",
+    "navigation", "nav", "websiteType", "website_type", "header", "footer", "branding", "fonts"
+}
+
+# Shared assets regenerated along with the pages on a full regeneration
+SHARED_FILES = ["styles.css", "script.js"]
+
+HOME_PAGE_NAMES = {"home", "index", "landing", "main"}
+
+def page_filename(page):
+    """Maps a page name from structured input to its HTML file; generation and validation both use this."""
+    slug = page.lower().replace(' ', '-')
+    return "index.html" if slug in HOME_PAGE_NAMES else f"{slug}.html"
+
+def diff_structured_input(old, new, prefix=""):
+    """Returns the dotted paths (e.g. "projects.2.description") whose values differ between old and new."""
+    if isinstance(old, dict) and isinstance(new, dict):
+        changes = []
+        for key in sorted(set(old) | set(new), key=str):
+            if str(key).startswith("_"):
+                continue
+            path = f"{prefix}{key}"
+            if key not in old or key not in new:
+                changes.append(path)
+            else:
+                changes.extend(diff_structured_input(old[key], new[key], f"{path}."))
+        return changes
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changes = []
+        for i, (old_item, new_item) in enumerate(zip(old, new)):
+            changes.extend(diff_structured_input(old_item, new_item, f"{prefix}{i}."))
+        return changes
+    return [] if old == new else [prefix.rstrip(".")]
+
+def _pages_in(value, page_files):
+    """Returns the page files whose name appears as a word in value."""
+    # "aboutSection", "about_section" and "About Section" all mention the about page
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(value)).lower()
+    words = set(re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", text.replace("_", "-").replace(" ", "-")))
+    words |= set(re.findall(r"[a-z0-9]+", text))
+    matched = set()
+    for file_name in page_files:
+        slug = file_name[:-len(".html")]
+        if slug in words or (file_name == "index.html" and words & HOME_PAGE_NAMES):
+            matched.add(file_name)
+    return matched
+
+def _placement_pages(old, new, page_files):
+    """
+    Returns the pages affected by image placement changes. Placements are matched by image path, so
+    an added, removed or moved image touches the page it was on as well as the page it is on now.
+    """
+    def by_path(data):
+        return {
+            img.get("path"): img.get("placement", "")
+            for img in data.get("image_placements", []) if isinstance(img, dict)
+        }
+
+    old_placements, new_placements = by_path(old), by_path(new)
+    touched = set()
+    for path in set(old_placements) | set(new_placements):
+        before, after = old_placements.get(path), new_placements.get(path)
+        if before == after:
+            continue
+        pages = set()
+        for placement in (before, after):
+            if placement is not None:
+                pages |= _pages_in(placement, page_files) or {"index.html"}
+        touched |= pages
+    return touched
+
+def plan_regeneration(old, new, existing_files):
+    """
+    Decides which files need regenerating after structured input changed from old to new.
+
+    Returns (files_to_regenerate, changes). A change under a key named after a page only touches
+    that page; image placements touch the pages they were and are placed on; anything else touches
+    every page (for single-page sites, just index.html). Changes to GLOBAL_KEYS regenerate the whole site.
+    """
+    changes = diff_structured_input(old, new)
+    if not changes:
+        return [], changes
+
+    page_files = sorted(f for f in existing_files if f.endswith(".html"))
+    if new.get("website_structure") == "multi-page":
+        page_files = sorted(set(page_files) | {page_filename(p) for p in new.get("pages", [])})
+    if not page_files:
+        page_files = ["index.html"]
+
+    if any(path.split(".")[0] in GLOBAL_KEYS for path in changes):
+        return sorted(set(page_files) | {f for f in SHARED_FILES if f in existing_files}), changes
+
+    to_regenerate = set()
+    for path in changes:
+        if path.split(".")[0] == "image_placements":
+            continue
+
+        # The first path component that names a page decides which page the content lives on
+        touched = set()
+        for component in path.split("."):
+            touched = _pages_in(component, page_files)
+            if touched:
+                break
+        to_regenerate |= touched or set(page_files)
+
+    if any(path.split(".")[0] == "image_placements" for path in changes):
+        to_regenerate |= _placement_pages(old, new, page_files)
+
+    return sorted(to_regenerate), changes
+
+def resolve_source_folder(website_folder):
+    """
+    Accepts website_NNN or website_NNN_validated, as a bare name or a path, and returns the
+    website_NNN source folder.
+    """
+    website_folder = os.path.normpath(website_folder.strip())
+    if os.path.dirname(website_folder) == "":
+        website_folder = os.path.join(GENERATED_WEBSITES_DIR, website_folder)
+    if website_folder.endswith("_validated"):
+        website_folder = website_folder[:-len("_validated")]
+    return website_folder
@@ -1,20 +1,23 @@
-from openai import OpenAI
 import json
-import os
 import re
-from dotenv import load_dotenv
+from openai_client import create_chat_completion
+from prompt_payload import compact_json, token_usage_report
+from model_routing import route_stage
+from quality_gates import check_structured_input
 
-# Load environment variables
-load_dotenv()
+STAGE = "input"
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
-MODEL = "gpt-4o"
+def process_user_input(prompt, image_data, image_prompts, previous_input=None):
+    """
+    Turns the user's prompt into structured website data.
 
-openai = OpenAI(api_key=openai_api_key)
+    With previous_input (the stored data of an existing site) the prompt is treated as an edit: the
+    model returns previous_input with only the requested changes applied, keeping its keys and wording,
+    so the edit can be diffed against the site as it was.
+    """
+    if previous_input is not None:
+        return _apply_edit(prompt, image_data, image_prompts, previous_input)
 
-def process_user_input(prompt, image_data, image_prompts):
     structured_prompt = f"""
 Based on this user prompt:
 
@@ -57,20 +60,56 @@ Analyze the request carefully and extract structured data **without using hardco
 Return the response **only as a valid JSON object**, with no extra text.
 """
 
-    try:
-        response = openai.chat.completions.create(
-            model=MODEL,
+    return _structure(structured_prompt, image_data, image_prompts, temperature=0.5)
+
+def _apply_edit(prompt, image_data, image_prompts, previous_input):
+    # Image placements are rebuilt from the uploads below, and internal keys are never sent
+    current = {k: v for k, v in previous_input.items() if not str(k).startswith("_") and k != "image_placements"}
+
+    edit_prompt = f"""
+This is the current structured data for an existing website:
+
+{compact_json(current)}
+
+Apply this change requested by the user:
+
+{prompt}
+
+🔹 **STRICT RULES**
+- Return the COMPLETE structured data with the change applied, as a single valid JSON object.
+- Change ONLY the values the request requires. Copy every other key and value exactly as it is, with the same wording.
+- Keep the existing key names and nesting. Do not rename, reorder into new sections or drop keys.
+- Add a new key only when the request asks for content that has no existing place.
+
+Return the response **only as a valid JSON object**, with no extra text.
+"""
+
+    # Temperature 0 keeps untouched keys stable, so the diff only shows what the user asked to change
+    return _structure(edit_prompt, image_data, image_prompts, temperature=0)
+
+def _structure(structured_prompt, image_data, image_prompts, temperature):
+    responses = []
+
+    def call(model):
+        response = create_chat_completion(
+            hedge_key=f"{STAGE}/{model}",
+            model=model,
             messages=[
                 {"role": "system", "content": "You are a structured data generator. Your output must be valid JSON with standard array notation like [\"item1\", \"item2\"] for arrays. Do not use {\"0\": \"item1\", \"1\": \"item2\"} format for arrays."},
                 {"role": "user", "content": structured_prompt}
             ],
-            temperature=0.5,  # Lowered for more consistent results
+            temperature=temperature,
             response_format={"type": "json_object"}  # Ensure JSON output
         )
+        responses.append(response)
 
         # Extract response content
         response_text = response.choices[0].message.content.strip()
-        structured_data = json.loads(response_text)
+        return json.loads(response_text)
+
+    try:
+        # Start on the fast tier; escalate only if the output fails the schema check
+        structured_data, routing = route_stage(STAGE, call, check_structured_input)
         
         # 🔥 Fix: Define prompt_list before using it
         prompt_list = [p.strip() for p in image_prompts.split(",")] if image_prompts else []
@@ -81,6 +120,10 @@ Return the response **only as a valid JSON object**, with no extra text.
             placement = prompt_list[i] if i < len(prompt_list) else "auto"
             structured_data["image_placements"].append({"path": img["path"], "placement": placement})
 
+        # Internal keys (leading "_") are stripped before the data is embedded in later prompts
+        structured_data["_token_usage"] = token_usage_report(STAGE, responses)
+        structured_data["_token_usage"]["routing"] = routing
+
         return structured_data
     
     except Exception as e:
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from quality_gates import GATE_THRESHOLDS
+
+# Models each stage tries in order, fastest first. The next tier is used only when the
+# previous one's output fails the stage's quality gate. Override per stage with e.g.
+# MODEL_TIERS_GENERATION="gpt-4o" or MODEL_TIERS_INPUT="gpt-4o-mini,gpt-4o".
+DEFAULT_STAGE_TIERS = {
+    "input": ["gpt-4o-mini", "gpt-4o"],
+    "generation": ["gpt-4o-mini", "gpt-4o"],
+    "validation": ["gpt-4o-mini", "gpt-4o"],
+}
+
+# Every routed call is appended here as one JSON line, for tuning tiers and thresholds from data
+ROUTING_LOG_PATH = os.getenv("MODEL_ROUTING_LOG", os.path.join("generated_websites", "model_routing_log.jsonl"))
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+def stage_tiers(stage):
+    override = os.getenv(f"MODEL_TIERS_{stage.upper()}")
+    if override:
+        return [model.strip() for model in override.split(",") if model.strip()]
+    return DEFAULT_STAGE_TIERS[stage]
+
+def _record(entry):
+    with _stats_lock:
+        stats = _stats.setdefault((entry["stage"], entry["model"]), {"latencies": [], "passed": 0, "escalated": 0})
+        stats["latencies"].append(entry["latency_seconds"])
+        stats["passed"] += entry["passed"]
+        stats["escalated"] += entry["escalated"]
+
+        try:
+            log_dir = os.path.dirname(ROUTING_LOG_PATH)
+            if log_dir:
+                os.makedirs(log_dir, exist_ok=True)
+            with open(ROUTING_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"⚠️ Could not write model routing log: {e}")
+
+def route_stage(stage, call, gate):
+    """
+    Runs call(model) on each of the stage's tiers in turn until gate(result) passes.
+
+    gate returns (score, failed checks); a result passes when score >= GATE_THRESHOLDS[stage].
+    The last tier's result is returned even if it fails the gate, and an exception on the last
+    tier is raised. Returns (result, routing) where routing records the model used and escalations.
+    """
+    tiers = stage_tiers(stage)
+    threshold = GATE_THRESHOLDS.get(stage, 0)
+    attempts = []
+
+    for tier, model in enumerate(tiers):
+        last_tier = tier == len(tiers) - 1
+        started = time.time()
+        try:
+            result = call(model)
+            score, failed = gate(result)
+        except Exception as e:
+            if last_tier:
+                raise
+            result, score, failed = None, 0.0, [f"{type(e).__name__}: {e}"]
+
+        passed = score >= threshold
+        entry = {
+            "stage": stage,
+            "model": model,
+            "tier": tier,
+            "latency_seconds": round(time.time() - started, 3),
+            "score": round(score, 3),
+            "passed": passed,
+            "escalated": not passed and not last_tier,
+            "failed_checks": failed[:10],
+            "timestamp": time.time()
+        }
+        _record(entry)
+        attempts.append({k: entry[k] for k in ("model", "latency_seconds", "score", "passed")})
+
+        if entry["escalated"]:
+            print(f"⬆️ [{stage}] {model} scored {score:.2f} (< {threshold}); escalating to {tiers[tier + 1]}")
+            continue
+        if not passed:
+            print(f"⚠️ [{stage}] {model} scored {score:.2f} (< {threshold}) on the last tier: {'; '.join(failed[:3])}")
+        return result, {"model": model, "escalations": tier, "attempts": attempts}
+
+def get_routing_stats():
+    """Per stage and model: calls, pass rate, escalation rate and latency percentiles for this process."""
+    with _stats_lock:
+        return {f"{stage}/{model}": _summarize(stats) for (stage, model), stats in _stats.items()}
+
+def _summarize(stats):
+    latencies = sorted(stats["latencies"])
+    calls = len(latencies)
+    return {
+        "calls": calls,
+        "pass_rate": round(stats["passed"] / calls, 3),
+        "escalation_rate": round(stats["escalated"] / calls, 3),
+        "latency_p50": round(statistics.median(latencies), 3),
+        "latency_p95": round(latencies[min(calls - 1, int(calls * 0.95))], 3),
+        "latency_mean": round(statistics.fmean(latencies), 3),
+    }
+
+def summarize_log(log_path=ROUTING_LOG_PATH):
+    """Aggregates a routing log file the same way get_routing_stats aggregates the live process."""
+    stats = {}
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            s = stats.setdefault(f"{entry['stage']}/{entry['model']}", {"latencies": [], "passed": 0, "escalated": 0})
+            s["latencies"].append(entry["latency_seconds"])
+            s["passed"] += entry["passed"]
+            s["escalated"] += entry["escalated"]
+    return {key: _summarize(s) for key, s in sorted(stats.items())}
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize per-tier latency and escalation rates from the model routing log.")
+    parser.add_argument("--log", default=ROUTING_LOG_PATH)
+    args = parser.parse_args()
+
+    print(f"{'stage/model':<28}{'calls':>7}{'pass':>7}{'escal.':>8}{'p50 s':>8}{'p95 s':>8}")
+    for key, s in summarize_log(args.log).items():
+        print(f"{key:<28}{s['calls']:>7}{s['pass_rate']:>7.0%}{s['escalation_rate']:>8.0%}{s['latency_p50']:>8.1f}{s['latency_p95']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
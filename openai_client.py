@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Hard limit for a single request, sized to each stage's output; a stalled call fails instead of
+# hanging the job. OPENAI_REQUEST_TIMEOUT_SECONDS overrides it for every stage.
+STAGE_TIMEOUT_SECONDS = {
+    "input": 60,
+    "generation": 240,
+    "validation": 180,
+}
+DEFAULT_TIMEOUT_SECONDS = 180
+REQUEST_TIMEOUT_OVERRIDE = os.getenv("OPENAI_REQUEST_TIMEOUT_SECONDS")
+# The SDK retries timeouts and 5xx/429 errors on its own. Hedging already covers slow calls, so one
+# retry is enough; a stalled call costs at most (1 + MAX_RETRIES) x its timeout.
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+
+# A duplicate "hedge" request is fired once a call has run longer than this percentile of
+# recent latencies for the same stage/model; whichever response arrives first wins
+HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "0.95"))
+# Until MIN_LATENCY_SAMPLES calls have been seen for a stage/model, hedge after this long
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("OPENAI_HEDGE_DEFAULT_DELAY_SECONDS", "120"))
+MIN_LATENCY_SAMPLES = 20
+LATENCY_WINDOW = 200
+# Never let hedges exceed this share of requests, so hedging can't materially raise volume
+HEDGE_MAX_RATIO = float(os.getenv("OPENAI_HEDGE_MAX_RATIO", "0.1"))
+# Requests (including hedges) running at once; batch runs raise it to fit their worker count
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENT_REQUESTS", "32"))
+
+_client = None
+_client_lock = threading.Lock()
+
+_executor = None
+_inflight = {}
+_inflight_lock = threading.Lock()
+_latencies = {}
+_counters = {"requests": 0, "hedges": 0, "hedge_wins": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, creating it on first use.
+
+    dotenv and openai are only imported here, so the pipeline modules can be imported
+    (by workers, tooling or tests) without credentials and without paying for the openai import.
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            from dotenv import load_dotenv
+            from openai import OpenAI
+
+            load_dotenv()
+
+            openai_api_key = os.getenv("OPENAI_API_KEY")
+            if not openai_api_key:
+                raise ValueError("OPENAI_API_KEY environment variable not set")
+            # Per-request timeouts are set in create_chat_completion; this only covers direct client use
+            _client = OpenAI(api_key=openai_api_key, timeout=request_timeout(None), max_retries=MAX_RETRIES)
+    return _client
+
+def request_timeout(hedge_key):
+    """Timeout in seconds for one request of the stage named in hedge_key (e.g. "generation/gpt-4o")."""
+    if REQUEST_TIMEOUT_OVERRIDE:
+        return float(REQUEST_TIMEOUT_OVERRIDE)
+    stage = (hedge_key or "").split("/")[0]
+    return STAGE_TIMEOUT_SECONDS.get(stage, DEFAULT_TIMEOUT_SECONDS)
+
+def _get_executor():
+    global _executor
+    with _client_lock:
+        if _executor is None:
+            # Imported on first call, like openai itself, to keep worker start-up fast
+            from concurrent.futures import ThreadPoolExecutor
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS, thread_name_prefix="openai")
+    return _executor
+
+def ensure_request_capacity(concurrent_requests):
+    """Raises MAX_CONCURRENT_REQUESTS to at least concurrent_requests, so callers never queue behind the limit."""
+    global MAX_CONCURRENT_REQUESTS, _executor
+    with _client_lock:
+        if concurrent_requests <= MAX_CONCURRENT_REQUESTS:
+            return
+        MAX_CONCURRENT_REQUESTS = concurrent_requests
+        if _executor is not None:
+            # Requests already submitted finish on the old pool; new ones go to a larger one
+            _executor.shutdown(wait=False)
+            _executor = None
+
+def hedge_delay(hedge_key):
+    """Seconds to wait before hedging a call: the HEDGE_PERCENTILE latency seen for hedge_key."""
+    with _stats_lock:
+        samples = sorted(_latencies.get(hedge_key, ()))
+    if len(samples) < MIN_LATENCY_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    return samples[min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE))]
+
+def _timed_call(hedge_key, kwargs, running=None):
+    if running is not None:
+        running.set()
+    started = time.time()
+    response = get_openai_client().chat.completions.create(**kwargs)
+    with _stats_lock:
+        _latencies.setdefault(hedge_key, deque(maxlen=LATENCY_WINDOW)).append(time.time() - started)
+    return response
+
+def _may_hedge():
+    with _stats_lock:
+        # One hedge of slack so a freshly started worker can still hedge its first stalled call
+        if _counters["hedges"] > HEDGE_MAX_RATIO * _counters["requests"]:
+            return False
+        _counters["hedges"] += 1
+        return True
+
+def _hedged_call(hedge_key, kwargs):
+    """Runs the request, firing one duplicate if it is slower than usual; the first success wins."""
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    executor = _get_executor()
+    running = threading.Event()
+    primary = executor.submit(_timed_call, hedge_key, kwargs, running)
+    with _stats_lock:
+        _counters["requests"] += 1
+
+    # The hedge timer starts when the request is sent, so time spent queued never triggers a hedge
+    running.wait()
+    # Hedge by half the timeout at the latest, so the duplicate still has time to finish
+    done, _ = wait([primary], timeout=min(hedge_delay(hedge_key), kwargs["timeout"] / 2))
+    if done or not _may_hedge():
+        return primary.result()
+
+    print(f"🔀 [{hedge_key}] request slower than p{int(HEDGE_PERCENTILE * 100)}; sending a hedged duplicate")
+    hedge = executor.submit(_timed_call, hedge_key, kwargs)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    with _stats_lock:
+                        _counters["hedge_wins"] += 1
+                # The slower request can't be cancelled mid-flight; its result is simply discarded
+                return future.result()
+            error = future.exception()
+    raise error
+
+def create_chat_completion(hedge_key=None, **kwargs):
+    """
+    Drop-in for client.chat.completions.create(**kwargs) used by every pipeline stage.
+
+    Identical requests already in flight (e.g. a double-clicked Generate button) share one
+    result instead of each paying for a call, and slow calls are hedged with a duplicate request
+    (see HEDGE_PERCENTILE). hedge_key groups latencies, e.g. "generation/gpt-4o".
+    """
+    from concurrent.futures import Future
+
+    hedge_key = hedge_key or kwargs.get("model", "default")
+    kwargs.setdefault("timeout", request_timeout(hedge_key))
+    request_key = hashlib.sha256(json.dumps(kwargs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    with _inflight_lock:
+        leader = _inflight.get(request_key)
+        if leader is None:
+            future = _inflight[request_key] = Future()
+    if leader is not None:
+        with _stats_lock:
+            _counters["coalesced"] += 1
+        print(f"🔗 [{hedge_key}] identical request already in flight; sharing its result")
+        return leader.result()
+
+    try:
+        response = _hedged_call(hedge_key, kwargs)
+        future.set_result(response)
+        return response
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(request_key, None)
+
+def get_request_stats():
+    """Request, hedge and coalescing counts plus the current hedge delay per stage/model."""
+    with _stats_lock:
+        stats = dict(_counters)
+        keys = list(_latencies)
+    stats["hedge_delays"] = {key: round(hedge_delay(key), 2) for key in keys}
+    return stats
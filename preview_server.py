@@ -0,0 +1,256 @@
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+from retention import ensure_site_available
+
+# Bind address for preview servers; set PREVIEW_HOST=0.0.0.0 to reach previews from other machines
+PREVIEW_HOST = os.getenv("PREVIEW_HOST", "127.0.0.1")
+# Host name used in the returned preview URLs
+PREVIEW_PUBLIC_HOST = os.getenv("PREVIEW_PUBLIC_HOST", "localhost" if PREVIEW_HOST in ("127.0.0.1", "0.0.0.0") else PREVIEW_HOST)
+
+# Live preview servers; past this many, the least recently viewed one is stopped
+MAX_PREVIEWS = int(os.getenv("PREVIEW_MAX_SERVERS", "8"))
+
+# Serving a site marks it as used (so retention won't archive it) at most this often
+TOUCH_INTERVAL_SECONDS = 60
+
+VERSION_PATH = "/__preview/version"
+RELOAD_INTERVAL_MS = 1000
+
+# Explicit types for the files we generate; mimetypes misses some of these on minimal systems
+MIME_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".json": "application/json; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".ico": "image/x-icon",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+    ".txt": "text/plain; charset=utf-8",
+}
+
+# Only text-like responses at least this large are gzipped
+GZIP_MIN_BYTES = 512
+_GZIP_TYPES = ("text/", "application/json", "image/svg+xml")
+
+LIVE_RELOAD_SCRIPT = """
+<script>
+(function () {
+    var current = null;
+    setInterval(function () {
+        fetch("%s", {cache: "no-store"}).then(function (r) { return r.json(); }).then(function (data) {
+            if (current === null) { current = data.version; }
+            else if (data.version !== current) { location.reload(); }
+        }).catch(function () {});
+    }, %d);
+})();
+</script>
+""" % (VERSION_PATH, RELOAD_INTERVAL_MS)
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+class PreviewSite:
+    """A site served by the preview server, backed either by a folder on disk or an in-memory dict of files."""
+
+    def __init__(self, folder=None, files=None):
+        if (folder is None) == (files is None):
+            raise ValueError("PreviewSite needs exactly one of folder or files")
+        self.folder = os.path.abspath(folder) if folder else None
+        self.files = dict(files) if files is not None else None
+        self._memory_version = 0
+        self._lock = threading.Lock()
+        self.last_access = time.time()
+        self._last_touch = 0
+
+    def update_files(self, files):
+        """Replaces the in-memory files; open previews reload automatically."""
+        with self._lock:
+            self.files = dict(files)
+            self._memory_version += 1
+
+    def version(self):
+        if self.files is not None:
+            return str(self._memory_version)
+        latest = 0
+        for root, dirs, files in os.walk(self.folder):
+            for name in files:
+                try:
+                    latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+                except OSError:
+                    continue
+        return str(latest)
+
+    def _keep_available(self):
+        """Marks the site as used, restoring it first if retention archived it while the preview was open."""
+        now = time.time()
+        if now - self._last_touch < TOUCH_INTERVAL_SECONDS and os.path.isdir(self.folder):
+            return
+        self._last_touch = now
+        ensure_site_available(self.folder)
+
+    def read(self, path):
+        """Returns the bytes for a site-relative path, or None if there is no such file."""
+        self.last_access = time.time()
+        if self.files is not None:
+            with self._lock:
+                content = self.files.get(path)
+            if content is None:
+                return None
+            return content.encode("utf-8") if isinstance(content, str) else content
+
+        self._keep_available()
+        file_path = os.path.join(self.folder, *path.split("/"))
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            return f.read()
+
+def _site_path(request_path):
+    """Normalises a URL path to a site-relative file path; returns None for paths escaping the site root."""
+    path = unquote(urlsplit(request_path).path)
+    path = posixpath.normpath("/" + path.lstrip("/"))
+    if ".." in path.split("/"):
+        return None
+    path = path.lstrip("/")
+    if path in ("", "."):
+        return "index.html"
+    return path
+
+def _content_type(path):
+    ext = os.path.splitext(path)[1].lower()
+    return MIME_TYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+class _PreviewHandler(BaseHTTPRequestHandler):
+    site = None
+
+    def do_GET(self):
+        if urlsplit(self.path).path == VERSION_PATH:
+            body = json.dumps({"version": self.site.version()}).encode("utf-8")
+            return self._send(200, body, "application/json; charset=utf-8")
+
+        path = _site_path(self.path)
+        if path is None:
+            return self._send(403, b"Forbidden", "text/plain; charset=utf-8")
+
+        # Resolve directories and clean URLs the same way Vercel does
+        candidates = [path]
+        if not os.path.splitext(path)[1]:
+            candidates += [path + ".html", path + "/index.html"]
+
+        for candidate in candidates:
+            content = self.site.read(candidate)
+            if content is not None:
+                content_type = _content_type(candidate)
+                if content_type.startswith("text/html"):
+                    content = self._inject_live_reload(content)
+                return self._send(200, content, content_type)
+
+        not_found = self.site.read("404.html")
+        if not_found is not None:
+            return self._send(404, self._inject_live_reload(not_found), MIME_TYPES[".html"])
+        return self._send(404, b"Not found", "text/plain; charset=utf-8")
+
+    def do_HEAD(self):
+        self._head_only = True
+        self.do_GET()
+
+    def _inject_live_reload(self, content):
+        html = content.decode("utf-8", errors="replace")
+        index = html.lower().rfind("</body>")
+        if index == -1:
+            html += LIVE_RELOAD_SCRIPT
+        else:
+            html = html[:index] + LIVE_RELOAD_SCRIPT + html[index:]
+        return html.encode("utf-8")
+
+    def _send(self, status, body, content_type):
+        gzipped = (
+            len(body) >= GZIP_MIN_BYTES
+            and content_type.startswith(_GZIP_TYPES)
+            and "gzip" in self.headers.get("Accept-Encoding", "")
+        )
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Vary", "Accept-Encoding")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if not getattr(self, "_head_only", False):
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Previews poll for reloads every second; keep the console quiet
+        pass
+
+def start_preview(folder=None, files=None, name=None, port=0):
+    """
+    Serves a website folder (or an in-memory dict of files) on a local HTTP server and returns its URL.
+
+    Previewing the same folder, or in-memory files under the same name, again reuses the running
+    server. Open pages reload automatically when the folder's files or the in-memory files change.
+    At most MAX_PREVIEWS servers run at once; starting another stops the least recently viewed one.
+    """
+    site = PreviewSite(folder=folder, files=files)
+    key = site.folder or name or id(site)
+
+    with _servers_lock:
+        if key in _servers:
+            existing = _servers[key]["site"]
+            existing.last_access = time.time()
+            if files is not None:
+                existing.update_files(files)
+            return _servers[key]["url"]
+
+        handler = type("PreviewHandler", (_PreviewHandler,), {"site": site})
+        server = ThreadingHTTPServer((PREVIEW_HOST, port), handler)
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name=f"preview-{server.server_port}", daemon=True)
+        thread.start()
+
+        url = f"http://{PREVIEW_PUBLIC_HOST}:{server.server_port}/"
+        _servers[key] = {"server": server, "site": site, "url": url}
+
+        evicted = []
+        while len(_servers) > MAX_PREVIEWS:
+            oldest = min(_servers, key=lambda k: _servers[k]["site"].last_access)
+            evicted.append(_servers.pop(oldest))
+
+    # shutdown() waits for the serve loop to exit, so it runs outside the lock
+    for entry in evicted:
+        _shutdown(entry)
+        print(f"🛑 Stopped preview {entry['url']} to stay within {MAX_PREVIEWS} running previews")
+
+    print(f"👀 Preview for {folder or 'in-memory site'} running at {url}")
+    return url
+
+def _shutdown(entry):
+    entry["server"].shutdown()
+    entry["server"].server_close()
+
+def stop_preview(folder=None, name=None):
+    """Stops the preview server for a folder (or named in-memory site), if one is running."""
+    with _servers_lock:
+        entry = _servers.pop(os.path.abspath(folder) if folder else name, None)
+    if entry:
+        _shutdown(entry)
+        return True
+    return False
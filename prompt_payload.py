@@ -0,0 +1,179 @@
+import copy
+import json
+import math
+import os
+
+# Max tokens for the structured-data payload embedded in each stage's prompt
+STAGE_TOKEN_BUDGETS = {
+    "generation": 6000,
+    "validation": 4000,
+}
+
+# Keys each stage never needs (internal keys starting with "_" are always dropped)
+STAGE_DROP_KEYS = {
+    "generation": {"error"},
+    "validation": {"error"},
+}
+
+# Dropped first, at any depth, when a payload is over budget
+LOW_PRIORITY_KEYS = {"keywords", "meta_keywords", "metaKeywords", "tags", "notes", "examples", "placeholder_notes"}
+
+# Long strings are never trimmed below this many characters
+MIN_STRING_LENGTH = 80
+# Long lists are never trimmed below this many items
+MIN_LIST_ITEMS = 3
+
+_encoding = None
+
+def count_tokens(text):
+    """Counts tokens with tiktoken when it is installed, otherwise estimates ~4 characters per token."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / 4)
+
+def compact_json(data):
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+def _prune(value, drop_keys):
+    """Removes dropped/internal keys, empty values and duplicate list items."""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            if key in drop_keys or str(key).startswith("_"):
+                continue
+            item = _prune(item, drop_keys)
+            if item in (None, "", [], {}):
+                continue
+            pruned[key] = item
+        return pruned
+    if isinstance(value, list):
+        pruned, seen = [], set()
+        for item in value:
+            item = _prune(item, drop_keys)
+            if item in (None, "", [], {}):
+                continue
+            marker = compact_json(item)
+            if marker in seen:
+                continue
+            seen.add(marker)
+            pruned.append(item)
+        return pruned
+    return value
+
+def _drop_low_priority(value):
+    if isinstance(value, dict):
+        return {k: _drop_low_priority(v) for k, v in value.items() if k not in LOW_PRIORITY_KEYS}
+    if isinstance(value, list):
+        return [_drop_low_priority(v) for v in value]
+    return value
+
+def _longest(value, kind):
+    """Returns (container, key, length) of the longest string or list in the data."""
+    best = (None, None, 0)
+    stack = [value]
+    while stack:
+        node = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else []
+        for key, item in items:
+            if isinstance(item, kind) and len(item) > best[2]:
+                best = (node, key, len(item))
+            if isinstance(item, (dict, list)):
+                stack.append(item)
+    return best
+
+def _trim_to_budget(data, budget):
+    """
+    Drops low-priority keys, then shortens the longest strings and lists by about as much as the
+    payload is over budget until it fits.
+    """
+    if count_tokens(compact_json(data)) <= budget:
+        return data, False
+
+    data = _drop_low_priority(data)
+    while True:
+        payload = compact_json(data)
+        tokens = count_tokens(payload)
+        if tokens <= budget:
+            break
+        # Characters to remove, estimated from this payload's own characters-per-token ratio
+        excess_chars = math.ceil((tokens - budget) * len(payload) / tokens)
+
+        container, key, length = _longest(data, str)
+        # +1 leaves room for the "…" marker so an already-trimmed string isn't trimmed forever
+        if container is not None and length > MIN_STRING_LENGTH + 1:
+            keep = max(MIN_STRING_LENGTH, length - excess_chars - 1)
+            container[key] = container[key][:keep].rstrip() + "…"
+            continue
+
+        container, key, length = _longest(data, list)
+        if container is not None and length > MIN_LIST_ITEMS:
+            list_chars = len(compact_json(container[key]))
+            keep = int(length * (list_chars - excess_chars) / list_chars)
+            container[key] = container[key][:max(MIN_LIST_ITEMS, min(length - 1, keep))]
+            continue
+
+        # Nothing left that can be trimmed safely; send it over budget rather than lose content
+        break
+    return data, True
+
+def _image_paths_relative(data):
+    """Rewrites image placement paths to the images/ folder the generated site uses."""
+    for img in data.get("image_placements", []):
+        if isinstance(img, dict) and "path" in img:
+            img["path"] = f"images/{os.path.basename(img['path'])}"
+    return data
+
+def build_prompt_payload(structured_data, stage):
+    """
+    Serializes structured_data for embedding in a stage's prompt.
+
+    Returns (payload, report) where payload is compact JSON without keys the stage doesn't need,
+    empty values or duplicate list items, trimmed to the stage's token budget. The report holds the
+    token counts before and after compaction.
+    """
+    # Baseline is what the stages used to embed; internal metadata was never part of it
+    original_tokens = count_tokens(json.dumps({k: v for k, v in structured_data.items() if not str(k).startswith("_")}, indent=2))
+
+    data = _image_paths_relative(copy.deepcopy(structured_data))
+    data = _prune(data, STAGE_DROP_KEYS.get(stage, set()))
+    budget = STAGE_TOKEN_BUDGETS.get(stage)
+    trimmed = False
+    if budget:
+        data, trimmed = _trim_to_budget(data, budget)
+
+    payload = compact_json(data)
+    report = {
+        "stage": stage,
+        "payload_tokens": count_tokens(payload),
+        "uncompacted_payload_tokens": original_tokens,
+        "budget": budget,
+        "trimmed": trimmed
+    }
+    return payload, report
+
+def token_usage_report(stage, response, payload_report=None):
+    """
+    Combines the local payload counts with the API's reported usage and prints a one-line summary.
+    response may be a list of responses (e.g. a call plus its continuations); their usage is summed.
+    """
+    report = dict(payload_report or {"stage": stage})
+    responses = response if isinstance(response, list) else [response]
+    usages = [r.usage for r in responses if getattr(r, "usage", None) is not None]
+    if usages:
+        report["prompt_tokens"] = sum(getattr(u, "prompt_tokens", 0) or 0 for u in usages)
+        report["completion_tokens"] = sum(getattr(u, "completion_tokens", 0) or 0 for u in usages)
+    if len(responses) > 1:
+        report["requests"] = len(responses)
+
+    saved = ""
+    if "payload_tokens" in report:
+        saved = f", payload {report['payload_tokens']} tokens (was {report['uncompacted_payload_tokens']})"
+    print(f"📊 [{stage}] prompt {report.get('prompt_tokens')} / completion {report.get('completion_tokens')} tokens{saved}")
+    return report
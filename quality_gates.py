@@ -0,0 +1,111 @@
+import re
+from html.parser import HTMLParser
+
+# Minimum score (0-1) a stage's output needs to pass without escalating to a stronger model
+GATE_THRESHOLDS = {
+    "input": 1.0,
+    "generation": 0.8,
+    "validation": 0.8,
+}
+
+WEBSITE_STRUCTURES = ("single-page", "multi-page")
+
+# Pages shorter than this are almost certainly placeholders or refusals
+MIN_PAGE_LENGTH = 800
+
+def _is_index_keyed(value):
+    """True for objects like {"0": "a", "1": "b"} that should have been arrays."""
+    return isinstance(value, dict) and len(value) > 1 and all(str(k).isdigit() for k in value)
+
+def _has_index_keyed(value):
+    if _is_index_keyed(value):
+        return True
+    if isinstance(value, dict):
+        return any(_has_index_keyed(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_index_keyed(v) for v in value)
+    return False
+
+def check_structured_input(structured_data):
+    """Schema check for stage 1 output. Returns (score, failed checks)."""
+    if not isinstance(structured_data, dict) or not structured_data:
+        return 0.0, ["not a JSON object"]
+
+    structure = structured_data.get("website_structure")
+    pages = structured_data.get("pages")
+    content_keys = [k for k in structured_data if k not in ("website_structure", "pages", "image_placements")]
+    checks = {
+        "website_structure is single-page or multi-page": structure in WEBSITE_STRUCTURES,
+        "multi-page sites list their pages": structure != "multi-page" or (
+            isinstance(pages, list) and bool(pages) and all(isinstance(p, str) and p.strip() for p in pages)
+        ),
+        "has content besides the structure": bool(content_keys),
+        "arrays use list notation": not _has_index_keyed(structured_data),
+    }
+    failed = [name for name, ok in checks.items() if not ok]
+    return 1 - len(failed) / len(checks), failed
+
+class _TagCounter(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.tags = {}
+        self.images_without_alt = 0
+        self.viewport = False
+
+    def handle_starttag(self, tag, attrs):
+        self.tags[tag] = self.tags.get(tag, 0) + 1
+        attrs = dict(attrs)
+        if tag == "img" and not attrs.get("alt"):
+            self.images_without_alt += 1
+        if tag == "meta" and attrs.get("name") == "viewport":
+            self.viewport = True
+
+def _score_page(html):
+    """Static checks for one HTML page. Returns (score, failed checks)."""
+    parser = _TagCounter()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        return 0.0, ["unparseable HTML"]
+
+    tags = parser.tags
+    checks = {
+        "long enough to be a real page": len(html) >= MIN_PAGE_LENGTH,
+        "has <html>, <head> and <body>": all(tags.get(t) for t in ("html", "head", "body")),
+        "has a <title>": bool(tags.get("title")),
+        "has a viewport meta tag": parser.viewport,
+        "uses semantic sections": any(tags.get(t) for t in ("header", "main", "section", "footer", "nav")),
+        "images have alt text": parser.images_without_alt == 0,
+        "is not a design guide": not re.search(r"UI/UX Excellence|Design Guide", html),
+    }
+    failed = [name for name, ok in checks.items() if not ok]
+    return 1 - len(failed) / len(checks), failed
+
+def score_website_files(files, expected_files=None):
+    """
+    Static validation score (0-1) for a set of generated files: the average page score, scaled
+    down for expected HTML pages that are missing. Returns (score, failed checks).
+    """
+    pages = {name: content for name, content in (files or {}).items() if name.endswith(".html") and isinstance(content, str)}
+    if not pages:
+        return 0.0, ["no HTML files"]
+
+    failed, total = [], 0.0
+    for name, html in pages.items():
+        score, page_failed = _score_page(html)
+        total += score
+        failed += [f"{name}: {check}" for check in page_failed]
+    score = total / len(pages)
+
+    # Page file names vary ("About Us" -> about.html or about-us.html), so only the count is compared
+    expected_pages = [f for f in (expected_files or []) if f.endswith(".html")]
+    if expected_pages:
+        missing = max(0, len(expected_pages) - len(pages))
+        score *= 1 - missing / len(expected_pages)
+        if missing:
+            failed.append(f"{missing} of {len(expected_pages)} expected pages missing")
+    if "index.html" in expected_pages and "index.html" not in pages:
+        score *= 0.5
+        failed.append("missing index.html")
+    return score, failed
@@ -0,0 +1,282 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from save_website_code_files import GENERATED_WEBSITES_DIR, ARCHIVE_DIR
+from model_routing import ROUTING_LOG_PATH
+
+UPLOAD_FOLDER = os.path.join("static", "uploads")
+ARCHIVE_INDEX = os.path.join(ARCHIVE_DIR, "index.json")
+
+# Sites untouched for this long are packed into archives
+MAX_SITE_AGE_DAYS = float(os.getenv("RETENTION_MAX_SITE_AGE_DAYS", "14"))
+# Size caps; when exceeded the least recently used sites are archived / archives deleted
+MAX_LIVE_MB = float(os.getenv("RETENTION_MAX_LIVE_MB", "2048"))
+MAX_ARCHIVE_MB = float(os.getenv("RETENTION_MAX_ARCHIVE_MB", "10240"))
+# Uploaded images are copied into each site, so the originals can go after this long
+MAX_UPLOAD_AGE_DAYS = float(os.getenv("RETENTION_MAX_UPLOAD_AGE_DAYS", "7"))
+# The model routing log is rotated past this size; one rotated copy (.1) is kept
+MAX_ROUTING_LOG_MB = float(os.getenv("RETENTION_MAX_ROUTING_LOG_MB", "50"))
+# Sites used more recently than this are never archived, so running jobs are left alone
+MIN_IDLE_SECONDS = 3600
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+
+_SITE_NAME = re.compile(r"^(website_\d+)(_validated)?$")
+
+# Serialises archiving and restoring so a site is never packed while it is being restored
+_retention_lock = threading.RLock()
+
+def _archive_format():
+    """tar+zstd when the zstandard package is installed, zip otherwise."""
+    try:
+        import zstandard
+        return ".tar.zst"
+    except ImportError:
+        return ".zip"
+
+def _load_index():
+    if not os.path.exists(ARCHIVE_INDEX):
+        return {}
+    with open(ARCHIVE_INDEX, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_index(index):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = ARCHIVE_INDEX + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp_path, ARCHIVE_INDEX)
+
+def _site_folders(name):
+    """The folders that make up one site: website_NNN and website_NNN_validated."""
+    folders = [os.path.join(GENERATED_WEBSITES_DIR, name), os.path.join(GENERATED_WEBSITES_DIR, f"{name}_validated")]
+    return [folder for folder in folders if os.path.isdir(folder)]
+
+def _site_usage(folders):
+    """Returns (last used timestamp, size in bytes) across a site's folders."""
+    last_used, size = 0, 0
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            last_used = max(last_used, os.stat(root).st_mtime)
+            for file_name in files:
+                stat = os.stat(os.path.join(root, file_name))
+                last_used = max(last_used, stat.st_mtime)
+                size += stat.st_size
+    return last_used, size
+
+def _live_sites():
+    """Returns {site name: (last used timestamp, size in bytes)} for every unarchived site."""
+    if not os.path.isdir(GENERATED_WEBSITES_DIR):
+        return {}
+
+    names = set()
+    for entry in os.listdir(GENERATED_WEBSITES_DIR):
+        match = _SITE_NAME.match(entry)
+        if match and os.path.isdir(os.path.join(GENERATED_WEBSITES_DIR, entry)):
+            names.add(match.group(1))
+    return {name: _site_usage(_site_folders(name)) for name in names}
+
+def touch_site(name):
+    """Marks a site as just used, which keeps it out of age and LRU archiving for a while."""
+    now = time.time()
+    for folder in _site_folders(name):
+        os.utime(folder, (now, now))
+
+def archive_site(name, min_idle_seconds=0):
+    """
+    Packs website_NNN and website_NNN_validated into one compressed archive and removes the folders.
+    Sites used within the last min_idle_seconds are left alone.
+    """
+    with _retention_lock:
+        folders = _site_folders(name)
+        if not folders:
+            return None
+
+        last_used, original_bytes = _site_usage(folders)
+        if time.time() - last_used < min_idle_seconds:
+            return None
+
+        import tarfile
+        import zipfile
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        archive_path = os.path.join(ARCHIVE_DIR, name + _archive_format())
+        tmp_path = archive_path + ".tmp"
+
+        if archive_path.endswith(".tar.zst"):
+            import zstandard
+            with open(tmp_path, "wb") as f, zstandard.ZstdCompressor(level=10).stream_writer(f) as writer:
+                with tarfile.open(fileobj=writer, mode="w|") as tar:
+                    for folder in folders:
+                        tar.add(folder, arcname=os.path.basename(folder))
+        else:
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+                for folder in folders:
+                    for root, dirs, files in os.walk(folder):
+                        for file_name in files:
+                            file_path = os.path.join(root, file_name)
+                            zf.write(file_path, os.path.relpath(file_path, GENERATED_WEBSITES_DIR))
+        os.replace(tmp_path, archive_path)
+
+        index = _load_index()
+        index[name] = {
+            "archive": os.path.basename(archive_path),
+            "archived_at": time.time(),
+            "last_access": last_used,
+            "original_bytes": original_bytes,
+            "archive_bytes": os.path.getsize(archive_path)
+        }
+        _save_index(index)
+
+        for folder in folders:
+            shutil.rmtree(folder)
+
+        print(f"🗜️ Archived {name}: {original_bytes // 1024} KB -> {index[name]['archive_bytes'] // 1024} KB")
+        return archive_path
+
+def restore_site(name):
+    """Unpacks an archived site back into generated_websites. Returns False if it isn't archived."""
+    with _retention_lock:
+        index = _load_index()
+        entry = index.get(name)
+        if not entry:
+            return False
+
+        import tarfile
+        import zipfile
+
+        archive_path = os.path.join(ARCHIVE_DIR, entry["archive"])
+        if archive_path.endswith(".tar.zst"):
+            import zstandard
+            with open(archive_path, "rb") as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                with tarfile.open(fileobj=reader, mode="r|") as tar:
+                    tar.extractall(GENERATED_WEBSITES_DIR, filter="data")
+        else:
+            with zipfile.ZipFile(archive_path) as zf:
+                zf.extractall(GENERATED_WEBSITES_DIR)
+
+        os.remove(archive_path)
+        del index[name]
+        _save_index(index)
+        touch_site(name)
+
+        print(f"📦 Restored {name} from {entry['archive']}")
+        return True
+
+def ensure_site_available(website_folder):
+    """
+    Makes sure a site's folders are on disk, restoring them from the archive if needed.
+    Accepts website_NNN / website_NNN_validated as a name or a path; returns False if the site is unknown.
+    """
+    match = _SITE_NAME.match(os.path.basename(os.path.normpath(website_folder)))
+    if not match:
+        return os.path.isdir(website_folder)
+
+    name = match.group(1)
+    with _retention_lock:
+        if _site_folders(name):
+            touch_site(name)
+            return True
+        return restore_site(name)
+
+def purge_old_uploads(max_age_days=MAX_UPLOAD_AGE_DAYS):
+    """Deletes uploaded images older than max_age_days; sites keep their own copies under images/."""
+    if not os.path.isdir(UPLOAD_FOLDER):
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for file_name in os.listdir(UPLOAD_FOLDER):
+        file_path = os.path.join(UPLOAD_FOLDER, file_name)
+        if os.path.isfile(file_path) and os.path.getmtime(file_path) < cutoff:
+            os.remove(file_path)
+            removed += 1
+    return removed
+
+def rotate_routing_log(max_mb=MAX_ROUTING_LOG_MB):
+    """Moves the model routing log to <log>.1 once it passes max_mb; the next routed call starts a new file."""
+    if not os.path.exists(ROUTING_LOG_PATH) or os.path.getsize(ROUTING_LOG_PATH) <= max_mb * 1024 * 1024:
+        return False
+    # model_routing opens the log per write, so renaming it never loses an entry
+    os.replace(ROUTING_LOG_PATH, ROUTING_LOG_PATH + ".1")
+    print(f"🔄 Rotated {ROUTING_LOG_PATH} past {max_mb:.0f} MB")
+    return True
+
+def enforce_retention(max_age_days=MAX_SITE_AGE_DAYS, max_live_mb=MAX_LIVE_MB, max_archive_mb=MAX_ARCHIVE_MB):
+    """
+    One retention pass: archives sites older than max_age_days, then archives the least recently
+    used sites until live sites fit in max_live_mb, then deletes the least recently used archives
+    until archives fit in max_archive_mb, and finally purges old uploads and rotates the routing log.
+    """
+    summary = {"archived": [], "evicted": [], "uploads_removed": 0, "routing_log_rotated": False}
+    now = time.time()
+
+    # The lock is only held per site (inside archive_site), so restores on access never wait for a whole pass
+    sites = _live_sites()
+    idle_sites = sorted(
+        (last_used, name) for name, (last_used, size) in sites.items() if now - last_used > MIN_IDLE_SECONDS
+    )
+
+    live_bytes = sum(size for last_used, size in sites.values())
+    for last_used, name in idle_sites:
+        too_old = now - last_used > max_age_days * 86400
+        over_cap = live_bytes > max_live_mb * 1024 * 1024
+        if not too_old and not over_cap:
+            continue
+        if archive_site(name, min_idle_seconds=MIN_IDLE_SECONDS):
+            live_bytes -= sites[name][1]
+            summary["archived"].append(name)
+
+    with _retention_lock:
+        index = _load_index()
+        archive_bytes = sum(entry["archive_bytes"] for entry in index.values())
+        for name, entry in sorted(index.items(), key=lambda item: item[1]["last_access"]):
+            if archive_bytes <= max_archive_mb * 1024 * 1024:
+                break
+            archive_path = os.path.join(ARCHIVE_DIR, entry["archive"])
+            if os.path.exists(archive_path):
+                os.remove(archive_path)
+            archive_bytes -= entry["archive_bytes"]
+            del index[name]
+            summary["evicted"].append(name)
+        if summary["evicted"]:
+            _save_index(index)
+            print(f"🗑️ Evicted {len(summary['evicted'])} archived site(s) to stay under {max_archive_mb:.0f} MB")
+
+    summary["uploads_removed"] = purge_old_uploads()
+    summary["routing_log_rotated"] = rotate_routing_log()
+    return summary
+
+def start_retention_worker(interval_seconds=RETENTION_INTERVAL_SECONDS):
+    """Runs enforce_retention every interval_seconds on a daemon thread. Set the returned event to stop it."""
+    stop_event = threading.Event()
+
+    def worker():
+        while not stop_event.is_set():
+            try:
+                enforce_retention()
+            except Exception as e:
+                print(f"⚠️ Retention pass failed: {e}")
+            stop_event.wait(interval_seconds)
+
+    threading.Thread(target=worker, name="retention", daemon=True).start()
+    return stop_event
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old generated websites and enforce size caps.")
+    parser.add_argument("--max-age-days", type=float, default=MAX_SITE_AGE_DAYS)
+    parser.add_argument("--max-live-mb", type=float, default=MAX_LIVE_MB)
+    parser.add_argument("--max-archive-mb", type=float, default=MAX_ARCHIVE_MB)
+    parser.add_argument("--restore", metavar="SITE", help="Restore one archived site (e.g. website_012) and exit")
+    args = parser.parse_args()
+
+    if args.restore:
+        return 0 if ensure_site_available(args.restore) else 1
+
+    summary = enforce_retention(args.max_age_days, args.max_live_mb, args.max_archive_mb)
+    print(f"✅ Archived {len(summary['archived'])}, evicted {len(summary['evicted'])}, removed {summary['uploads_removed']} old upload(s)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
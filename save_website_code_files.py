@@ -2,10 +2,20 @@ import os
 import json
 import shutil
 import re
+import threading
 
 # Use a relative path instead of absolute path
 GENERATED_WEBSITES_DIR = os.path.join("generated_websites")
 
+# Old sites are packed into archives here by retention.py
+ARCHIVE_DIR = os.path.join(GENERATED_WEBSITES_DIR, "_archive")
+
+# Structured input a site was generated from, kept next to its files so edits can be diffed against it
+STRUCTURED_INPUT_FILE = "structured_input.json"
+
+# Serialises folder allocation so parallel jobs never share a website_NNN folder
+_folder_lock = threading.Lock()
+
 def fix_image_paths_in_html(html_content, images):
     print(f"Fixing image paths in HTML...")
     img_tags = re.findall(r'<img[^>]+src=[\'"]([^\'"]+)[\'"]', html_content)
@@ -35,15 +45,29 @@ def get_next_folder_name():
     if not os.path.exists(GENERATED_WEBSITES_DIR):
         os.makedirs(GENERATED_WEBSITES_DIR)
 
+    # Archived sites keep their numbers too, so a restored site never collides with a new one
     existing_folders = [f for f in os.listdir(GENERATED_WEBSITES_DIR) if f.startswith("website_")]
-    existing_numbers = sorted([int(f.split("_")[1]) for f in existing_folders if f.split("_")[1].isdigit()])
+    if os.path.isdir(ARCHIVE_DIR):
+        existing_folders += [f for f in os.listdir(ARCHIVE_DIR) if f.startswith("website_")]
+    existing_numbers = sorted([int(m.group(1)) for m in (re.match(r"website_(\d+)", f) for f in existing_folders) if m])
 
     next_number = existing_numbers[-1] + 1 if existing_numbers else 1
     return f"website_{str(next_number).zfill(3)}"
 
+def create_next_website_folder():
+    """Allocates and creates the next website_NNN folder, safe to call from parallel jobs."""
+    with _folder_lock:
+        while True:
+            website_folder = os.path.join(GENERATED_WEBSITES_DIR, get_next_folder_name())
+            try:
+                os.makedirs(website_folder)
+                return website_folder
+            except FileExistsError:
+                # Another process claimed this number first; pick the next one
+                continue
+
 def save_generated_website(website_json, images):
-    website_folder = os.path.join(GENERATED_WEBSITES_DIR, get_next_folder_name())
-    os.makedirs(website_folder, exist_ok=True)
+    website_folder = create_next_website_folder()
 
     try:
         website_data = json.loads(website_json) if isinstance(website_json, str) else website_json
@@ -104,4 +128,41 @@ def save_generated_website(website_json, images):
 
     except Exception as e:
         print(f"❌ Error saving website: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def save_structured_input(website_folder, structured_input):
+    file_path = os.path.join(website_folder, STRUCTURED_INPUT_FILE)
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump({k: v for k, v in structured_input.items() if not k.startswith("_")}, f, indent=2)
+
+def load_structured_input(website_folder):
+    """Returns the structured input stored with a generated website, or None if there is none."""
+    file_path = os.path.join(website_folder, STRUCTURED_INPUT_FILE)
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def update_website_files(website_folder, website_data, images):
+    """Overwrites only the given files in an existing website folder, copying any new images."""
+    images_dir = os.path.join(website_folder, "images")
+    os.makedirs(images_dir, exist_ok=True)
+
+    for img in images or []:
+        if isinstance(img, dict) and "path" in img and os.path.exists(img["path"]):
+            img_dest_path = os.path.join(images_dir, os.path.basename(img["path"]))
+            if not os.path.exists(img_dest_path):
+                shutil.copy(img["path"], img_dest_path)
+                print(f"🖼️ Copied image: {os.path.basename(img['path'])} to {img_dest_path}")
+
+    updated = []
+    for file_name, content in website_data.items():
+        if not content or os.path.basename(file_name) != file_name:
+            continue
+        if file_name.endswith(".html"):
+            content = fix_image_paths_in_html(content, images or [])
+        with open(os.path.join(website_folder, file_name), "w", encoding="utf-8") as f:
+            f.write(content)
+        updated.append(file_name)
+        print(f"✅ Updated {file_name}")
+    return updated
@@ -0,0 +1,91 @@
+import json
+import re
+
+MAX_CONTINUATIONS = 3
+
+_decoder = json.JSONDecoder()
+
+def _skip_whitespace(text, pos):
+    while pos < len(text) and text[pos] in " \t\r\n":
+        pos += 1
+    return pos
+
+def parse_partial_json_object(text):
+    """
+    Parses a JSON object that may have been cut off part way through.
+
+    Returns (entries, truncated_key, complete): every key/value pair that was fully written, the key
+    whose value was cut off (or None), and whether the object was closed properly.
+    """
+    text = re.sub(r"^```(?:json)?|```$", "", text.strip()).strip()
+    entries = {}
+    pos = _skip_whitespace(text, 0)
+    if not text.startswith("{", pos):
+        return entries, None, False
+    pos += 1
+
+    while True:
+        pos = _skip_whitespace(text, pos)
+        if pos >= len(text):
+            return entries, None, False
+        if text[pos] == "}":
+            return entries, None, True
+        if text[pos] == ",":
+            pos += 1
+            continue
+
+        try:
+            key, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return entries, None, False
+
+        pos = _skip_whitespace(text, pos)
+        if not text.startswith(":", pos):
+            return entries, key, False
+        pos = _skip_whitespace(text, pos + 1)
+
+        try:
+            value, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return entries, key, False
+        entries[key] = value
+
+def request_json_files(create, messages, expected_files=None, max_continuations=MAX_CONTINUATIONS):
+    """
+    Calls create(messages) for a JSON object of files and recovers from truncated responses.
+
+    When the response hits the output token limit (finish_reason == "length") or is cut off, every
+    complete file is kept and follow-up requests ask only for the missing ones: the file that was cut
+    off, plus any expected_files not yet returned. Returns (files, responses).
+    """
+    files, responses = {}, []
+    request_messages = messages
+
+    for attempt in range(max_continuations + 1):
+        response = create(request_messages)
+        responses.append(response)
+
+        choice = response.choices[0]
+        entries, truncated_key, complete = parse_partial_json_object(choice.message.content or "")
+        files.update(entries)
+        if getattr(choice, "finish_reason", None) != "length" and complete:
+            break
+
+        missing = [f for f in ([truncated_key] if truncated_key else []) + list(expected_files or []) if f not in files]
+        missing = list(dict.fromkeys(missing))
+        if attempt == max_continuations:
+            print(f"⚠️ Response still incomplete after {max_continuations} continuation(s); missing: {', '.join(missing) or 'unknown'}")
+            break
+
+        print(f"✂️ Response truncated after {len(files)} complete file(s); requesting {', '.join(missing) or 'the remaining files'}")
+        wanted = f"ONLY these missing files: {', '.join(missing)}" if missing else "ONLY the files you had not written yet"
+        request_messages = messages + [{
+            "role": "user",
+            "content": (
+                f"Your previous response was cut off by the output length limit. These files are already complete "
+                f"and must NOT be repeated: {', '.join(files) or 'none'}. Return a valid JSON object containing {wanted}, "
+                f"in the same format as before."
+            )
+        }]
+
+    return files, responses
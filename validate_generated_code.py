@@ -1,27 +1,29 @@
 import os
-import json
-from openai import OpenAI
 import re
 import shutil
-from dotenv import load_dotenv
-
-load_dotenv()
-
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY environment variable not set")
-openai = OpenAI(api_key=openai_api_key)
-
-MODEL = "gpt-4o"
-
-def validate_and_fix_website(structured_input, website_folder):
+from openai_client import create_chat_completion
+from prompt_payload import build_prompt_payload, token_usage_report
+from tolerant_json import request_json_files
+from model_routing import route_stage
+from quality_gates import score_website_files
+from incremental_regeneration import page_filename
+
+STAGE = "validation"
+
+def validate_and_fix_website(structured_input, website_folder, only_files=None):
+    """
+    Validates the files in website_folder and writes the fixed site to website_folder + "_validated".
+
+    With only_files, just those files are revalidated; the other files already in the validated
+    folder are reused as they are.
+    """
     possible_files = ['index.html', 'styles.css', 'script.js', 'seo.json', 'alpine.js', 'tailwind.config.js', 'postcss.config.js']
     
     if structured_input.get("website_structure") == "multi-page" and "pages" in structured_input:
         for page in structured_input["pages"]:
-            page_filename = f"{page.lower().replace(' ', '-')}.html"
-            if page_filename not in possible_files and page_filename != "index.html":
-                possible_files.append(page_filename)
+            file_name = page_filename(page)
+            if file_name not in possible_files:
+                possible_files.append(file_name)
     
     website_files = {}
     any_files_exist = False
@@ -34,6 +36,10 @@ def validate_and_fix_website(structured_input, website_folder):
                     website_files[file_name] = file_content
                     any_files_exist = True
 
+    if only_files is not None:
+        website_files = {k: v for k, v in website_files.items() if k in only_files}
+        any_files_exist = bool(website_files)
+
     if not any_files_exist:
         return {"error": "❌ No website files found to validate. Please check the website generation step."}
 
@@ -88,10 +94,12 @@ def validate_and_fix_website(structured_input, website_folder):
                 f.write(html_content)
             print(f"✅ Saved updated {file_name} to {validated_html_path}")
 
+    payload, payload_report = build_prompt_payload(structured_input, STAGE)
+
     validation_prompt = f"""You are a senior UI/UX designer and front-end architect with exceptional attention to detail. Your task is to review and enhance the provided website code to ensure it meets professional standards.
 
 ### **Structured Input (User Requirements):**
-{json.dumps(structured_input, indent=2)}
+{payload}
 
 ### **Validation & Enhancement Tasks:**
 1. **Technical Accuracy**: Fix any errors in HTML, CSS, and JavaScript.  
@@ -123,43 +131,74 @@ def validate_and_fix_website(structured_input, website_folder):
 Return only a valid JSON object with the enhanced files.
 """
 
-    try:
-        response = openai.chat.completions.create(
-            model=MODEL,
-            messages=[
+    if only_files is not None:
+        validation_prompt += f"""
+### **Incremental Edit**:
+Only these files changed and need validating: {", ".join(website_files)}. Return ONLY these files; every other file is reused as it is.
+Fix and improve the current code below rather than rewriting it, so it stays consistent with the reused files.
+"""
+        for file_name, content in website_files.items():
+            validation_prompt += f"\n### Current {file_name}:\n{content}\n"
+
+    responses = []
+
+    def call(model):
+        def create(messages):
+            response = create_chat_completion(
+                hedge_key=f"{STAGE}/{model}",
+                model=model,
+                messages=messages,
+                temperature=0.2,
+                response_format={"type": "json_object"}
+            )
+            responses.append(response)
+            return response
+
+        # Keep every complete file from a truncated response and ask only for the missing ones
+        files, _ = request_json_files(
+            create,
+            [
                 {"role": "system", "content": "You are a professional web developer. Your ONLY job is to fix existing website code. Return ONLY a valid JSON object with the fixed files, nothing else."},
                 {"role": "user", "content": validation_prompt}
             ],
-            temperature=0.2,
-            response_format={"type": "json_object"}
+            expected_files=list(website_files)
         )
+        return files
 
-        response_text = response.choices[0].message.content.strip()
-        
-        try:
-            fixed_files = json.loads(response_text)
-            
-            if "index.html" in fixed_files and ("UI/UX Excellence" in fixed_files["index.html"] or 
-                                               "Design Guide" in fixed_files["index.html"]):
-                return {"error": "❌ Validation failed: Model returned a UI/UX guide instead of the expected website."}
-                
-            for file_name, content in fixed_files.items():
-                if content and content.strip():
-                    file_path = os.path.join(validated_folder, file_name)
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write(content)
-            
-            return {
-                "message": "✅ Website validated and fixed successfully!", 
-                "validated_folder": validated_folder, 
-                "fixed_files": [k for k, v in fixed_files.items() if v and v.strip()]
-            }
-        except json.JSONDecodeError as e:
-            return {"error": f"❌ Validation failed: Invalid JSON response: {str(e)}"}
+    def gate(files):
+        # Only what the model returned is scored, so an empty or HTML-less reply fails instead of passing on
+        # the original files; missing pages are penalised by count, as names vary between replies
+        return score_website_files(files, list(website_files))
+
+    try:
+        # Start on the fast tier; escalate only if the fixed site fails the static validation score
+        fixed_files, routing = route_stage(STAGE, call, gate)
+
+        if not fixed_files:
+            return {"error": "❌ Validation failed: Invalid JSON response: no complete files in the model output"}
+        if only_files is not None:
+            fixed_files = {k: v for k, v in fixed_files.items() if k in website_files}
+
+        if "index.html" in fixed_files and ("UI/UX Excellence" in fixed_files["index.html"] or 
+                                           "Design Guide" in fixed_files["index.html"]):
+            return {"error": "❌ Validation failed: Model returned a UI/UX guide instead of the expected website."}
+
+        for file_name, content in fixed_files.items():
+            if isinstance(content, str) and content.strip():
+                file_path = os.path.join(validated_folder, file_name)
+                with open(file_path, "w", encoding="utf-8") as f:
+                    f.write(content)
+
+        return {
+            "message": "✅ Website validated and fixed successfully!", 
+            "validated_folder": validated_folder, 
+            "fixed_files": [k for k, v in fixed_files.items() if isinstance(v, str) and v.strip()],
+            "token_usage": dict(token_usage_report(STAGE, responses, payload_report), routing=routing)
+        }
     
     except Exception as e:
         import traceback
         return {
             "error": f"❌ Validation failed: {str(e)}",
             "traceback": traceback.format_exc()
-        }
\ No newline at end of file
+        }
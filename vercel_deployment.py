@@ -7,6 +7,16 @@ from pathlib import Path
 import uuid
 import re
 
+def _existing_project_name(website_folder):
+    vercel_json_path = os.path.join(website_folder, "vercel.json")
+    if not os.path.exists(vercel_json_path):
+        return None
+    try:
+        with open(vercel_json_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("name")
+    except (OSError, ValueError):
+        return None
+
 def prepare_for_vercel(website_folder, custom_name=None):
     print(f"Preparing {website_folder} for Vercel deployment...")
 
@@ -15,6 +25,9 @@ def prepare_for_vercel(website_folder, custom_name=None):
         if not project_name[0].isalpha():
             project_name = f"web-{project_name}"
         project_name = project_name[:40]
+    elif _existing_project_name(website_folder):
+        # Redeploying an edited site: keep its project so Vercel only uploads the files that changed
+        project_name = _existing_project_name(website_folder)
     else:
         timestamp = int(time.time())
         unique_id = str(uuid.uuid4())[:8]
@@ -88,16 +101,12 @@ def deploy_to_vercel(website_folder, custom_name=None):
 
         project_name = prepare_for_vercel(website_folder, custom_name if custom_name else None)
 
-        original_dir = os.getcwd()
-        os.chdir(website_folder)
-
         print(f"🚀 Deploying {project_name} to Vercel...")
 
         # Replace with the correct path to your Vercel CLI or ensure it's globally available
         vercel_path = "vercel"  # e.g., r"C:\Users\YourUser\AppData\Roaming\npm\vercel.cmd"
-        result = subprocess.run([vercel_path, "--prod", "--yes"], capture_output=True, text=True, check=True)
-
-        os.chdir(original_dir)
+        # Run inside the website folder without os.chdir so parallel deployments don't clash
+        result = subprocess.run([vercel_path, "--prod", "--yes"], cwd=website_folder, capture_output=True, text=True, check=True)
 
         output_lines = result.stdout.split("\n")
         deployment_url = None
@@ -152,6 +161,3 @@ def deploy_to_vercel(website_folder, custom_name=None):
         return {
             "error": f"Deployment failed: {str(e)}"
         }
-    finally:
-        if 'original_dir' in locals():
-            os.chdir(original_dir)
\ No newline at end of file
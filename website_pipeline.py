@@ -0,0 +1,250 @@
+import hashlib
+import shutil
+import threading
+import time
+import os
+from input_processing import process_user_input
+from code_generation import generate_website_code
+from save_website_code_files import save_generated_website, save_structured_input, load_structured_input, update_website_files
+from validate_generated_code import validate_and_fix_website
+from vercel_deployment import deploy_to_vercel
+from incremental_regeneration import plan_regeneration, resolve_source_folder
+from retention import ensure_site_available
+
+# Use a relative path instead of absolute path
+UPLOAD_FOLDER = os.path.join("static", "uploads")
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+def _no_progress(value, desc=None):
+    pass
+
+def save_uploaded_images(images, image_prompts, name_suffix=""):
+    """Copies uploaded images into UPLOAD_FOLDER and pairs each one with its placement prompt."""
+    image_data = []
+    if not images:
+        return image_data
+
+    prompt_list = [p.strip() for p in image_prompts.split(",")] if image_prompts else []
+
+    for i, img in enumerate(images):
+        original_name = os.path.basename(img.name if hasattr(img, 'name') else img)
+        name, ext = os.path.splitext(original_name)
+        # Named by content, so re-submitting the same image yields identical prompts (and shared LLM calls)
+        source = img if isinstance(img, str) else getattr(img, 'name', None)
+        if source and os.path.isfile(source):
+            with open(source, "rb") as f:
+                tag = hashlib.sha256(f.read()).hexdigest()[:12]
+        else:
+            tag = str(int(time.time()*1000))
+        unique_name = f"{name}_{tag}{name_suffix}{ext}"  # e.g., upper_3f2a9c0d1b7e.jpeg
+        img_path = os.path.join(UPLOAD_FOLDER, unique_name)
+
+        if isinstance(img, str):
+            if os.path.exists(img_path):
+                # Refresh the mtime so retention's upload purge doesn't delete it while this job runs
+                os.utime(img_path)
+                print(f"Reusing uploaded image {img_path}")
+            elif os.path.abspath(img) != os.path.abspath(img_path):
+                shutil.copy(img, img_path)
+                print(f"Copied image from {img} to {img_path}")
+        else:
+            img.save(img_path)
+            print(f"Saved image to {img_path}")
+
+        img_prompt = prompt_list[i] if i < len(prompt_list) else "auto"
+        image_data.append({"path": img_path, "placement": img_prompt})
+
+    return image_data
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def run_once(key, job):
+    """
+    Runs job() unless a job with the same key is already running, in which case that job's result
+    is shared. Keeps a double-clicked Generate from building (and paying for) the same site twice.
+    """
+    # Imported on first call to keep worker start-up fast
+    from concurrent.futures import Future
+
+    with _jobs_lock:
+        leader = _jobs.get(key)
+        if leader is None:
+            future = _jobs[key] = Future()
+    if leader is not None:
+        print("🔗 Identical job already running; sharing its result")
+        return leader.result()
+
+    try:
+        result = job()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _jobs_lock:
+            _jobs.pop(key, None)
+
+def run_pipeline(prompt, image_data, image_prompts, website_name=None, deploy=True, preview=False, progress=None):
+    """
+    Runs input processing, generation, saving and validation for one website, then optionally
+    starts a local preview and/or deploys it to Vercel.
+    """
+    progress = progress or _no_progress
+
+    # Processing input
+    structured_input = process_user_input(prompt, image_data, image_prompts)
+    if "error" in structured_input:
+        return {"error": structured_input["error"]}
+
+    # Generating code
+    progress(0.25, desc="Generating website code...")
+    generated_code = generate_website_code(structured_input)
+    if "error" in generated_code:
+        return {"error": generated_code["error"]}
+
+    token_usage = {
+        "input": structured_input.get("_token_usage"),
+        "generation": generated_code.pop("token_usage", None)
+    }
+
+    # Saving website files
+    progress(0.5, desc="Saving website files...")
+    website_folder = save_generated_website(generated_code, image_data)
+    if not website_folder:
+        return {"error": "❌ Website generation failed. Please try again."}
+    save_structured_input(website_folder, structured_input)
+
+    # Validating website
+    progress(0.75, desc="Validating website...")
+    validation_result = validate_and_fix_website(structured_input, website_folder)
+    if "error" in validation_result:
+        return {"error": validation_result["error"]}
+
+    validated_folder = validation_result.get("validated_folder", website_folder)
+    token_usage["validation"] = validation_result.get("token_usage")
+
+    result = {
+        "message": "✅ Website generated and validated successfully!",
+        "local_folder": validated_folder,
+        "token_usage": token_usage
+    }
+    return _finish(result, website_name, deploy, preview, progress,
+                   "✅ Website generated, validated, and deployed successfully!")
+
+def edit_website(website_folder, prompt, image_data, image_prompts, website_name=None, deploy=True, preview=False, progress=None):
+    """
+    Applies an edited prompt to an already generated website, regenerating and revalidating only the
+    files whose inputs changed. Everything else is reused and the site keeps its folder (and Vercel project).
+    """
+    progress = progress or _no_progress
+    website_folder = resolve_source_folder(website_folder)
+    ensure_site_available(website_folder)
+
+    previous_input = load_structured_input(website_folder)
+    if previous_input is None:
+        return {"error": f"❌ No stored input found for {website_folder}. Generate it again to enable editing."}
+
+    # Processing input: the prompt is applied as an edit to the stored input, so unchanged keys stay identical
+    structured_input = process_user_input(prompt, image_data, image_prompts, previous_input=previous_input)
+    if "error" in structured_input:
+        return {"error": structured_input["error"]}
+    structured_input["image_placements"] = merge_image_placements(
+        previous_input.get("image_placements", []), structured_input.get("image_placements", [])
+    )
+
+    current_files = {}
+    for file_name in os.listdir(website_folder):
+        file_path = os.path.join(website_folder, file_name)
+        if os.path.isfile(file_path) and file_name.endswith((".html", ".css", ".js")):
+            with open(file_path, "r", encoding="utf-8") as f:
+                current_files[file_name] = f.read()
+
+    files_to_regenerate, changes = plan_regeneration(previous_input, structured_input, current_files)
+    validated_folder = website_folder + "_validated"
+    token_usage = {"input": structured_input.get("_token_usage")}
+    result = {
+        "local_folder": validated_folder,
+        "changed_inputs": changes,
+        "regenerated_files": files_to_regenerate,
+        "reused_files": sorted(f for f in current_files if f not in files_to_regenerate),
+        "token_usage": token_usage
+    }
+
+    if not files_to_regenerate:
+        result["message"] = "✅ Nothing changed; the existing website was reused."
+        return _finish(result, website_name, deploy, preview, progress, result["message"])
+
+    print(f"✏️ Regenerating {', '.join(files_to_regenerate)} for changes in {', '.join(changes)}")
+
+    # Generating only the affected files
+    progress(0.25, desc=f"Regenerating {len(files_to_regenerate)} file(s)...")
+    generated_code = generate_website_code(structured_input, only_files=files_to_regenerate, current_files=current_files)
+    if "error" in generated_code:
+        return {"error": generated_code["error"]}
+    token_usage["generation"] = generated_code.pop("token_usage", None)
+
+    # Saving only the affected files
+    progress(0.5, desc="Saving website files...")
+    updated_files = update_website_files(website_folder, generated_code, structured_input.get("image_placements", []))
+    save_structured_input(website_folder, structured_input)
+
+    # Validating only the affected files
+    progress(0.75, desc="Validating changed files...")
+    validation_result = validate_and_fix_website(structured_input, website_folder, only_files=updated_files)
+    if "error" in validation_result:
+        return {"error": validation_result["error"]}
+    token_usage["validation"] = validation_result.get("token_usage")
+
+    result["regenerated_files"] = updated_files
+    result["message"] = f"✅ Website updated: regenerated {len(updated_files)} file(s), reused {len(result['reused_files'])}."
+    return _finish(result, website_name, deploy, preview, progress, f"{result['message']} Redeployed to Vercel.")
+
+def merge_image_placements(previous, uploaded):
+    """
+    Keeps the images a site already has and adds the new uploads. Uploads are named by content, so
+    re-uploading an image the site already uses just updates its placement.
+    """
+    merged = {img["path"]: img for img in previous if isinstance(img, dict) and "path" in img}
+    for img in uploaded:
+        merged[img["path"]] = img
+    return list(merged.values())
+
+def _finish(result, website_name, deploy, preview, progress, deployed_message):
+    """Starts the preview and/or deploys the validated folder in result["local_folder"]."""
+    validated_folder = result["local_folder"]
+    if preview:
+        # http.server is only loaded when a preview is asked for, keeping headless workers quick to start
+        from preview_server import start_preview
+        result["preview_url"] = start_preview(validated_folder)
+
+    if not deploy:
+        progress(1.0, desc="Preview ready! 👀" if preview else "Website generated! 🎉")
+        return result
+
+    # Deploying to Vercel
+    progress(0.9, desc="Deploying to Vercel...")
+    result.update(promote_website(validated_folder, website_name))
+    if "error" not in result:
+        result["message"] = deployed_message
+        progress(1.0, desc="Website deployed! 🚀")
+    return result
+
+def promote_website(local_folder, website_name=None):
+    """Deploys an already generated and validated website folder to Vercel."""
+    ensure_site_available(local_folder)
+    deployment_result = deploy_to_vercel(local_folder, website_name)
+
+    if "error" in deployment_result:
+        return {
+            "error": deployment_result["error"],
+            "local_folder": local_folder
+        }
+
+    return {
+        "message": "✅ Website deployed successfully!",
+        "deployment_url": deployment_result.get("url", "URL not available"),
+        "local_folder": local_folder,
+        "project_name": deployment_result.get("project_name", "")
+    }